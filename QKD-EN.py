@@ -1,11 +1,17 @@
 import os
-import random 
+import mmap
+import struct
+import secrets
 import logging  
 import hashlib  
 import math  
 import time  
 from datetime import datetime  
-from typing import List, Tuple, Optional  
+from functools import lru_cache
+from itertools import repeat
+from typing import Tuple, Optional  
+
+import numpy as np
 
 if os.name == 'nt': # For Windows  
     os.system('title Quantum Key Distribution')  
@@ -15,6 +21,10 @@ else: # For Unix/Linux/Mac
 # Constants  
 PREVIEW_LINE_LENGTH = 50  
 PROGRESS_BAR_LENGTH = 30  
+FILE_MAGIC = b'QKD1'
+FILE_HEADER = struct.Struct('<4s14s16sI')  # magic, timestamp, salt, chunk count
+CHUNK_LENGTH = struct.Struct('<I')
+VERIFY_HASH_SIZE = 32
 
 # Setup logging  
 logging.basicConfig(  
@@ -32,9 +42,90 @@ def show_progress(current: int, total: int, prefix: str = '', suffix: str = ''):
     if current == total:  
         print()  
 
+def _sift(alice_bits, alice_bases, bob_bases, verify_n):
+    """Sift matched qubits into key and verification bits"""
+    matched_bits = alice_bits[alice_bases == bob_bases]
+    return matched_bits[verify_n:], matched_bits[:verify_n], len(matched_bits)
+
+@lru_cache(maxsize=32)
+def _derive_transport_key(salt: str, timestamp: str) -> str:
+    """Derive the transport key from the file salt and timestamp"""
+    return hashlib.pbkdf2_hmac(
+        'sha256',
+        salt.encode(),
+        timestamp.encode(),
+        100000
+    ).hex()[:32]
+
+def _verification_hash(*parts: bytes) -> bytes:
+    """File integrity hash, fed field by field without concatenating"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part)
+    return h.digest()
+
+def _read_export(data: mmap.mmap) -> Tuple[str, str, list, list, int, bytes, bytes]:
+    """Split a mapped export file into its header fields, chunk records and hashes"""
+    magic, timestamp, salt, chunk_count = FILE_HEADER.unpack_from(data, 0)
+    if magic != FILE_MAGIC:
+        raise ValueError("Unknown file type")
+
+    # Records alternate key, chunk, key, chunk... each behind a u32 length
+    body_end = len(data) - VERIFY_HASH_SIZE
+    records = []
+    offset = FILE_HEADER.size
+    while offset < body_end:
+        (length,) = CHUNK_LENGTH.unpack_from(data, offset)
+        offset += CHUNK_LENGTH.size + length
+        # Slicing the mapping copies each record out, so none outlive the file
+        records.append(data[offset - length:offset])
+    if offset != body_end:
+        raise ValueError("Truncated chunk record")
+
+    with memoryview(data)[:body_end] as body:
+        check_hash = _verification_hash(body)
+    return (
+        timestamp.decode('ascii'),
+        salt.decode('ascii'),
+        records[0::2],
+        records[1::2],
+        chunk_count,
+        data[body_end:],
+        check_hash
+    )
+
+def _encrypt_chunk(chunk: bytes, chunk_key: np.ndarray, tk_bytes: np.ndarray) -> Tuple[bytes, bytes]:
+    """Encrypt one message chunk and its quantum key"""
+    binary_chunk = len(chunk).to_bytes(4, 'big') + chunk
+    pad = np.packbits(chunk_key)
+    encrypted_bytes = np.bitwise_xor(np.frombuffer(binary_chunk, np.uint8), pad)
+
+    packed_key = len(chunk_key).to_bytes(4, 'big') + pad.tobytes()
+    key_bytes = np.frombuffer(packed_key, np.uint8)
+    encrypted_key = np.bitwise_xor(key_bytes, np.resize(tk_bytes, key_bytes.size))
+    return encrypted_bytes.tobytes(), encrypted_key.tobytes()
+
+def _decrypt_chunk(encrypted_chunk: bytes, encrypted_key: bytes, tk_bytes: np.ndarray) -> bytes:
+    """Decrypt one message chunk with its quantum key"""
+    encrypted_key_bytes = np.frombuffer(encrypted_key, np.uint8)
+    decrypted_key = np.bitwise_xor(
+        encrypted_key_bytes, np.resize(tk_bytes, encrypted_key_bytes.size)
+    )
+    key_length = int.from_bytes(decrypted_key[:4].tobytes(), 'big')
+    chunk_key = np.unpackbits(decrypted_key[4:])[:key_length]
+
+    encrypted_bytes = np.frombuffer(encrypted_chunk, np.uint8)
+    decrypted_binary = np.bitwise_xor(encrypted_bytes, np.packbits(chunk_key)).tobytes()
+    message_length = int.from_bytes(decrypted_binary[:4], 'big')
+    decrypted_chunk = decrypted_binary[4:4+message_length]
+    if not decrypted_chunk:
+        raise Exception("Empty chunk")
+    return decrypted_chunk
+
 class SecureBB84:  
     """Implementation of BB84 protocol for Quantum Key Distribution"""  
     def __init__(self):  
+        # Bases are 0/1 ids; names are for display only
         self.bases = ['rectilinear', 'diagonal']  
         self.error_threshold = 0.15  
         self.num_qubits = 1000000  
@@ -42,25 +133,21 @@ class SecureBB84:
         self.verification_bits = 40  
         self.noise_threshold = 0.95  
         self.chunk_size = 1000  
+        self.rng = np.random.default_rng()
 
-    def secure_random(self) -> int:  
-        """Generate safe random bits"""  
-        return random.getrandbits(1)  
-
-    def simulate_transmission(self, bit: int, send_basis: str, receive_basis: str) -> Tuple[int, float]:  
-        """Qubit transmission simulation"""  
-        if send_basis == receive_basis:  
-            return bit, 1.0  
-        return self. secure_random(), 0.5  
+    def secure_random_bits(self, count: int) -> np.ndarray:
+        """Generate safe random bits"""
+        raw = os.urandom((count + 7) // 8)
+        return np.unpackbits(np.frombuffer(raw, np.uint8))[:count]
 
-    def verify_key_security(self, key: List[int]) -> bool:  
+    def verify_key_security(self, key: np.ndarray) -> bool:  
         """Key security verification"""  
         if len(key) < self.min_key_length:  
             return False  
-        ones = sum(key) / len(key)  
+        ones = float(key.mean())
         return 0.3 <= ones <= 0.7  
 
-    def generate_key(self) -> Tuple[Optional[List[int]], float]:  
+    def generate_key(self) -> Tuple[Optional[np.ndarray], float]:  
         """Generate new quantum key"""  
         try:  
             retry_count = 0  
@@ -68,51 +155,22 @@ class SecureBB84:
             
             while retry_count < max_retries:  
                 # Generate quantum bits  
-                alice_bits = [self.secure_random() for _ in range(self.num_qubits)]  
-                alice_bases = [random.choice(self.bases) for _ in range(self.num_qubits)]  
-                bob_bases = [random.choice(self.bases) for _ in range(self.num_qubits)]  
-                
-                received_bits = []  
-                received_confidence = []  
-                
-                # Simulate transmission with progress  
-                for i in range(self.num_qubits):  
-                    bit, conf = self.simulate_transmission(  
-                        alice_bits[i],  
-                        alice_bases[i],  
-                        bob_bases[i]  
-                    )  
-                    received_bits.append(bit)  
-                    received_confidence.append(conf)  
-                    
-                    if i % 100 == 0:  
-                        show_progress(i, self.num_qubits, 'Generating quantum key: ')  
-                
-                show_progress(self.num_qubits, self.num_qubits, 'Generating quantum key: ')  
-                
-                # Key sifting  
-                sifted_key = []  
-                verification_bits = []  
-                errors = 0  
-                total_matched = 0  
-                
-                print("\nSifting quantum key...")  
-                for i in range(self.num_qubits):  
-                    if alice_bases[i] == bob_bases[i]:  
-                        total_matched += 1  
-                        if alice_bits[i] != received_bits[i]:  
-                            errors += 1  
-                        
-                        if len(verification_bits) < self.verification_bits:  
-                            verification_bits.append(alice_bits[i])  
-                        else:  
-                            sifted_key.append(alice_bits[i])  
-                    
-                    if i % 100 == 0:  
-                        show_progress(i, self.num_qubits, 'Shifting key: ')  
-                        
-                show_progress(self.num_qubits, self.num_qubits, 'Shifting key: ')  
-                
+                n = self.num_qubits
+                alice_bits = self.secure_random_bits(n)
+                # Bases are announced publicly during sifting, so a fast PRNG is enough
+                alice_bases = self.rng.integers(0, 2, size=n, dtype=np.uint8)
+                bob_bases = self.rng.integers(0, 2, size=n, dtype=np.uint8)
+
+                show_progress(n, n, 'Generating quantum key: ')
+
+                # Key sifting
+                print("\nSifting quantum key...")
+                sifted_key, verification_bits, total_matched = _sift(
+                    alice_bits, alice_bases, bob_bases, self.verification_bits
+                )
+                # Matching bases reproduce Alice's bit exactly on this noiseless channel
+                errors = 0
+
                 if total_matched == 0:  
                     retry_count += 1  
                     continue  
@@ -139,57 +197,34 @@ class EnhancedQKDSimulator:
         self.key_hash = None  
         self.use_count = 0  
         self.chunk_size = self.bb84.chunk_size  
-        self.key_pool = []  
+        # Unused pool bits live in key_pool[key_pool_head:]
+        self.key_pool = np.empty(0, dtype=np.uint8)
+        self.key_pool_head = 0
+        self.key_pool_bits = 0
 
-    def text_to_binary(self, text: str) -> str:  
+    def text_to_binary(self, text: str) -> bytes:  
         """Convert text to binary with newline preservation"""  
         try:  
             lines = []  
             for line in text.split('\n'):  
                 lines.append(' '.join(line.split()))  
             normalized_text = '\n'.join(lines)  
-            
-            text_bytes = normalized_text.encode('utf-8')  
-            binary_chunks = []  
-            for byte in text_bytes:  
-                binary_chunks.append(format(byte, '08b'))  
-            message_bits = ''.join(binary_chunks)  
-            length_bits = format(len(message_bits), '032b')  
-            return length_bits + message_bits  
+            return normalized_text.encode('utf-8')
         except Exception as e:  
             logging.error(f"Text to binary error: {str(e)}")  
             return None  
 
-    def binary_to_text(self, binary: str) -> str:  
+    def binary_to_text(self, binary: bytes) -> str:  
         """Binary to text conversion with newline preservation"""  
         try:  
-            message_length = int(binary[:32], 2)  
-            message_bits = binary[32:32+message_length]  
-            
-            if len(message_bits) % 8 != 0:  
-                padding = 8 - (len(message_bits) % 8)  
-                message_bits += '0' * padding  
-            
-            byte_chunks = [message_bits[i:i+8] for i in range(0, len(message_bits), 8)]  
-            bytes_data = bytearray()  
-            
-            for chunk in byte_chunks:  
-                if len(chunk) == 8:  
-                    try:  
-                        byte_val = int(chunk, 2)  
-                        if byte_val < 256:  
-                            bytes_data.append(byte_val)  
-                    except ValueError:  
-                        continue  
-            
             try:  
-                decoded = bytes_data.decode('utf-8', errors='ignore')  
+                decoded = binary.decode('utf-8', errors='ignore')  
                 lines = []  
                 for line in decoded.split('\n'):  
                     lines.append(' '.join(line.split()))  
                 return '\n'.join(lines)  
             except UnicodeDecodeError:  
-                return bytes_data.decode('latin-1', errors='ignore')  
+                return binary.decode('latin-1', errors='ignore')  
                 
         except Exception as e:  
             logging.error(f"Binary to text error: {str(e)}")  
@@ -198,13 +233,15 @@ class EnhancedQKDSimulator:
     def generate_key_pool(self, needed_length: int) -> bool:  
         """Generate quantum key pool as needed"""  
         try:  
-            current_length = sum(len(k) for k in self.key_pool)  
+            current_length = self.key_pool_bits
             while current_length < needed_length:  
                 print(f"\nGenerating additional keys ({current_length}/{needed_length} bits available)")  
                 key, error_rate = self.bb84.generate_key()  
-                if not key:  
+                if key is None:  
                     return False  
-                self.key_pool.append(key)  
+                self.key_pool = np.concatenate((self.key_pool[self.key_pool_head:], key))
+                self.key_pool_head = 0
+                self.key_pool_bits += len(key)
                 current_length += len(key)  
                 show_progress(current_length, needed_length, 'Key pool: ')  
             return True  
@@ -212,22 +249,15 @@ class EnhancedQKDSimulator:
             logging.error(f"Key pool generation error: {str(e)}")  
             return False  
 
-    def get_key_from_pool(self, length: int) -> List[int]:  
+    def get_key_from_pool(self, length: int) -> np.ndarray:  
         """Take the key from the pool according to the required length"""  
-        result = []  
-        while len(result) < length:  
-            if not self.key_pool:  
-                if not self.generate_key_pool(length - len(result)):  
-                    raise Exception("Failed to generate enough keys")  
-            current_key = self.key_pool[0]  
-            needed = length - len(result)  
-            if len(current_key) <= needed:  
-                result.extend(current_key)  
-                self.key_pool.pop(0)  
-            else:  
-                result.extend(current_key[:needed])  
-                self.key_pool[0] = current_key[needed:]  
-        return result  
+        if self.key_pool_bits < length:
+            if not self.generate_key_pool(length):
+                raise Exception("Failed to generate enough keys")
+        start = self.key_pool_head
+        self.key_pool_head += length
+        self.key_pool_bits -= length
+        return self.key_pool[start:self.key_pool_head]
 
     def get_multiline_input(self) -> str:  
         """Multiline input with 4 enter limit"""  
@@ -285,85 +315,62 @@ class EnhancedQKDSimulator:
             if input("\nContinue encryption? (y/n): ").lower() != 'y':  
                 return None, None  
 
+            message_bytes = self.text_to_binary(message)
+            if message_bytes is None:
+                return None, None
+
             # Split message into chunks  
             message_chunks = [  
-                message[i:i+self.chunk_size]   
-                for i in range(0, len(message), self.chunk_size)  
+                message_bytes[i:i+self.chunk_size]
+                for i in range(0, len(message_bytes), self.chunk_size)  
             ]  
 
             total_chunks = len(message_chunks)  
             print(f"\nProcessing {total_chunks} chunks...")  
 
-            encrypted_chunks = []  
+            # Keys come from the shared pool, so draw them all before encrypting
             keys_used = []  
-
-            # Encrypt each chunk  
-            for i, chunk in enumerate(message_chunks, 1):  
-                print(f"\nProcessing chunk {i}/{total_chunks}")  
-                binary_chunk = self.text_to_binary(chunk)  
-                if not binary_chunk:  
-                    return None, None  
-
-                chunk_length = len(binary_chunk)  
-                
+            for chunk in message_chunks:
                 try:  
-                    chunk_key = self.get_key_from_pool(chunk_length)  
+                    keys_used.append(self.get_key_from_pool((len(chunk) + 4) * 8))
                 except Exception as e:  
                     print("\nFailed to generate quantum key")  
                     return None, None  
 
-                encrypted_bits = [  
-                    str(int(a) ^ b)  
-                    for a, b in zip(binary_chunk, chunk_key)  
-                ]  
-                encrypted_chunks.append(''.join(encrypted_bits))  
-                keys_used.append(chunk_key)  
-                
-                show_progress(i, total_chunks, 'Encryption: ')  
-
             print("\nCreating transport key...")  
             timestamp = datetime.now().strftime('%Y%m%d%H%M%S')  
-            salt = hashlib.sha256(str(random.getrandbits(256)).encode()).hexdigest()[:16]  
-            transport_key = hashlib.pbkdf2_hmac(  
-                'sha256',  
-                salt.encode(),  
-                timestamp.encode(),  
-                100000  
-            ).hex()[:32]  
-
-            print("Encrypting key...")  
+            salt = secrets.token_hex(8)
+            transport_key = _derive_transport_key(salt, timestamp)
+            # Mask whole bytes: the packed key uses all eight bits of each byte
+            tk_bytes = np.frombuffer(bytes.fromhex(transport_key), np.uint8)
+
+            # Encrypt each chunk  
+            encrypted_chunks = []  
             all_keys = []  
-            for i, key in enumerate(keys_used, 1):  
-                key_str = ','.join(map(str, key))  
-                key_bytes = key_str.encode()  
-                encrypted_key = [  
-                    kb ^ int(transport_key[i % len(transport_key)], 16)  
-                    for i, kb in enumerate(key_bytes)  
-                ]  
-                all_keys.append(''.join(map(lambda x: format(x, '02x'), encrypted_key)))  
-                show_progress(i, len(keys_used), 'Key encryption: ')  
+            # Redraw the bar at most once per bar cell
+            progress_step = max(1, total_chunks // PROGRESS_BAR_LENGTH)
+            results = map(_encrypt_chunk, message_chunks, keys_used, repeat(tk_bytes))
+            for i, (encrypted_chunk, encrypted_key) in enumerate(results, 1):
+                encrypted_chunks.append(encrypted_chunk)
+                all_keys.append(encrypted_key)
+                if i % progress_step == 0 or i == total_chunks:
+                    show_progress(i, total_chunks, 'Encryption: ')
 
             print("\nPreparing export data...")  
-            encrypted_str = '###'.join(all_keys)  
-            encrypted_message = '###'.join(encrypted_chunks)  
-            
-            ver_hash = hashlib.sha256(  
-                f"{timestamp}{salt}{encrypted_str}{encrypted_message}".encode()  
-            ).hexdigest()  
+            export_parts = [FILE_HEADER.pack(FILE_MAGIC, timestamp.encode(), salt.encode(), total_chunks)]
+            for encrypted_key, encrypted_chunk in zip(all_keys, encrypted_chunks):
+                export_parts += [
+                    CHUNK_LENGTH.pack(len(encrypted_key)), encrypted_key,
+                    CHUNK_LENGTH.pack(len(encrypted_chunk)), encrypted_chunk
+                ]
+            ver_hash = _verification_hash(*export_parts)
 
             filename = f"qkd_message_{timestamp}.qk"  
-            export_str = "@@@".join([  
-                timestamp,  
-                salt,  
-                encrypted_str,  
-                encrypted_message,  
-                ver_hash,  
-                str(total_chunks)  
-            ])  
             
             print("Saving file...")  
-            with open(filename, 'w', encoding='utf-8') as f:  
-                f.write(export_str)  
+            with open(filename, 'wb') as f:
+                f.writelines(export_parts)
+                f.write(ver_hash)
 
             recovery_code = hashlib.sha256(transport_key.encode()).hexdigest()[:12]  
 
@@ -377,34 +384,27 @@ class EnhancedQKDSimulator:
         """Decrypt encrypted messages"""  
         try:  
             print("\nReading file...")  
-            with open(filename, 'r', encoding='utf-8') as f:  
-                data = f.read().strip()  
-
-            parts = data.split("@@@")  
-            if len(parts) != 6:  
-                print("\nInvalid file format")  
-                return None  
+            with open(filename, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < FILE_HEADER.size + VERIFY_HASH_SIZE:
+                    print("\nInvalid file format")  
+                    return None  
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    try:
+                        parts = _read_export(data)
+                    except (struct.error, ValueError):
+                        print("\nInvalid file format")  
+                        return None  
 
-            timestamp, salt, encrypted_keys_str, encrypted_message, ver_hash, chunk_count = parts  
-            chunk_count = int(chunk_count)  
+            timestamp, salt, encrypted_keys, encrypted_chunks, chunk_count, ver_hash, check_hash = parts
 
             print("Verifying file integrity...")  
-            check_hash = hashlib.sha256(  
-                f"{timestamp}{salt}{encrypted_keys_str}{encrypted_message}".encode()  
-            ).hexdigest()  
-
             if check_hash != ver_hash:  
                 print("\nWarning: File has been modified!")  
                 if input("Continue decryption? (y/n): ").lower() != 'y':  
                     return None  
 
             print("Creating transport key...")
-            transport_key = hashlib.pbkdf2_hmac(  
-                'sha256',  
-                salt.encode(),  
-                timestamp.encode(),  
-                100000  
-            ).hex()[:32]  
+            transport_key = _derive_transport_key(salt, timestamp)
 
             print("Verify recovery code...")  
             check_code = hashlib.sha256(transport_key.encode()).hexdigest()[:12]  
@@ -412,47 +412,30 @@ class EnhancedQKDSimulator:
                 print("\nRecovery code is invalid!")  
                 return None  
 
-            encrypted_keys = encrypted_keys_str.split("###")  
-            encrypted_chunks = encrypted_message.split("###")  
-
             if len(encrypted_keys) != chunk_count or len(encrypted_chunks) != chunk_count:  
                 print("\nData chunks are invalid")  
                 return None  
 
             print(f"\nProcessing {chunk_count} chunks...")  
             decrypted_chunks = []  
-            
+            tk_bytes = np.frombuffer(bytes.fromhex(transport_key), np.uint8)
+            results = map(_decrypt_chunk, encrypted_chunks, encrypted_keys, repeat(tk_bytes))
+            progress_step = max(1, chunk_count // PROGRESS_BAR_LENGTH)
+
             for i in range(chunk_count):  
                 try:  
-                    # Decrypt key  
-                    encrypted_key_bytes = bytes.fromhex(encrypted_keys[i])  
-                    decrypted_key = []  
-                    for j, eb in enumerate(encrypted_key_bytes):  
-                        tk_byte = int(transport_key[j % len(transport_key)], 16)  
-                        decrypted_key.append(eb ^ tk_byte)  
-                    key_str = bytes(decrypted_key).decode('utf-8', errors='ignore')  
-                    chunk_key = [int(k) for k in key_str.split(',') if k.strip()]  
-
-                    # Decrypt message chunk  
-                    decrypted_bits = [  
-                        str(int(a) ^ b)  
-                        for a, b in zip(encrypted_chunks[i], chunk_key)  
-                    ]  
-                    decrypted_binary = ''.join(decrypted_bits)  
-                    decrypted_chunk = self.binary_to_text(decrypted_binary)  
-                    
-                    if decrypted_chunk:  
-                        decrypted_chunks.append(decrypted_chunk)  
-                    else:  
-                        raise Exception(f"Failed to decrypt chunk {i+1}")  
-                        
-                    show_progress(i+1, chunk_count, 'Description: ')  
+                    decrypted_chunks.append(next(results))
+                    if (i+1) % progress_step == 0 or i+1 == chunk_count:
+                        show_progress(i+1, chunk_count, 'Description: ')
 
                 except Exception as e:  
                     logging.error(f"Chunk {i+1} decryption error: {str(e)}")  
                     return None  
 
-            decrypted_text = ''.join(decrypted_chunks)  
+            # Chunks split the UTF-8 bytes, so decode only once they are rejoined
+            decrypted_text = self.binary_to_text(b''.join(decrypted_chunks))
+            if decrypted_text is None:
+                return None
             
             # Format output with correct line breaks  
             formatted_lines = decrypted_text.split('\n')  
@@ -540,9 +523,9 @@ class EnhancedQKDSimulator:
                 if choice == '1':  
                     print("\nGenerating new quantum key...")  
                     key, error_rate = self.bb84.generate_key()  
-                    if key:  
+                    if key is not None:  
                         self.current_key = key  
-                        self.key_hash = hashlib.sha256(''.join(map(str, key)).encode()).hexdigest()  
+                        self.key_hash = hashlib.sha256(np.packbits(key).tobytes()).hexdigest()  
                         self.use_count = 0  
                         print(f"\nSuccessfully generated key ({len(key)} bits)")  
                         print(f"Error rate: {error_rate:.2%}")  
@@ -618,15 +601,6 @@ class EnhancedQKDSimulator:
 def main():  
     """Main functions of the program"""  
     try:  
-        # Set seed for reproducibility  
-        seed = int.from_bytes(  
-            hashlib.sha256(  
-                str(datetime.now().timestamp()).encode()  
-            ).digest(),   
-            'big'  
-        )  
-        random.seed(seed)  
-        
         # Run the simulator  
         simulator = EnhancedQKDSimulator()  
         simulator.run()  